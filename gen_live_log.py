@@ -2,20 +2,38 @@
 """Generate a live log file that can be followed with tail -f or loghew."""
 
 import random
-import datetime
+import string
 import time
 import sys
 import signal
+import queue
+import threading
+from bisect import bisect
+from itertools import accumulate
 
 OUTPUT = "live.log"
 
 LEVELS = ["TRACE", "DEBUG", "INFO", "WARN", "ERROR"]
 LEVEL_WEIGHTS = [5, 15, 60, 15, 5]
+BURST_LEVEL_WEIGHTS = [1, 5, 15, 35, 44]
+
+DELAYS = [0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0]
+DELAY_WEIGHTS = [20, 30, 25, 15, 5, 3, 2]
+
+# Cumulative weights for bisect-based picks; random.choices rebuilds these
+# (and a result list) on every call.
+LEVEL_CDF = list(accumulate(LEVEL_WEIGHTS))
+BURST_LEVEL_CDF = list(accumulate(BURST_LEVEL_WEIGHTS))
+DELAY_CDF = list(accumulate(DELAY_WEIGHTS))
 
 SERVICES = ["api-gateway", "auth-service", "user-service", "payment-service",
             "notification-service", "cache-manager", "db-pool", "scheduler",
             "message-queue", "load-balancer"]
 
+# " [LEVEL] [service] " between the timestamp and the message, prebuilt for
+# every combination so the hot path doesn't pad and bracket them per line.
+DECOR = {l: {s: f" [{l:<5}] [{s}] " for s in SERVICES} for l in LEVELS}
+
 ENDPOINTS = [
     "GET /api/v1/users", "POST /api/v1/users", "GET /api/v1/users/{id}",
     "PUT /api/v1/users/{id}", "DELETE /api/v1/users/{id}",
@@ -103,6 +121,9 @@ STACK_TRACES = [
     ],
 ]
 
+# Each trace pre-encoded as one newline-terminated blob, written in one call
+STACK_BLOBS = [("\n".join(t) + "\n").encode() for t in STACK_TRACES]
+
 REQUEST_IDS = [f"{random.randint(1000000, 9999999):07x}" for _ in range(100)]
 IPS = [f"192.168.{random.randint(1,254)}.{random.randint(1,254)}" for _ in range(30)]
 JOBS = ["cleanup-expired-sessions", "send-digest-emails", "aggregate-metrics", "sync-inventory"]
@@ -116,50 +137,191 @@ MSG_MAP = {
 }
 
 
-def fmt(msg):
-    return msg.format(
-        id=random.randint(1000, 99999),
-        n=random.randint(1, 999),
-        req_id=random.choice(REQUEST_IDS),
-        endpoint=random.choice(ENDPOINTS),
-        ms=random.choice([1, 3, 8, 23, 67, 120, 456, 1200, 5678]),
-        ip=random.choice(IPS),
-        count=random.randint(1, 500),
-        active=random.randint(10, 20),
-        total=20,
-        order=random.randint(10000, 99999),
-        amount=round(random.uniform(5.99, 2499.99), 2),
-        items=random.randint(1, 12),
-        service=random.choice(SERVICES),
-        size=random.randint(10, 5000),
-        pct=random.randint(75, 98),
-        total_mb=random.choice([512, 1024, 2048, 4096]),
-        free=round(random.uniform(0.5, 5.0), 1),
-        depth=random.randint(50, 5000),
-        ttl=random.randint(10, 3600),
-        queue=random.choice(QUEUES),
-        pos=random.randint(1, 500),
-        template=random.choice(TEMPLATES),
-        job=random.choice(JOBS),
-        filename=random.choice(FILENAMES),
-    )
+# Each line draws all of its random fields from one getrandbits call.
+# A field is (bits, fn): fn gets its own `bits`-wide slice of that word. Ints
+# and choices take 8 bits more than their range needs, which keeps the modulo
+# bias under 0.4%.
+
+def int_field(lo, hi):
+    span = hi - lo + 1
+    return span.bit_length() + 8, lambda r: lo + r % span
+
+
+def choice_field(seq):
+    n = len(seq)
+    return n.bit_length() + 8, lambda r: seq[r % n]
+
+
+def float_field(lo, hi, ndigits):
+    return 32, lambda r: round(lo + (hi - lo) * r / (1 << 32), ndigits)
+
+
+def const_field(value):
+    return 0, lambda r: value
+
+
+FIELD_GEN = {
+    "id": int_field(1000, 99999),
+    "n": int_field(1, 999),
+    "req_id": choice_field(REQUEST_IDS),
+    "endpoint": choice_field(ENDPOINTS),
+    "ms": choice_field([1, 3, 8, 23, 67, 120, 456, 1200, 5678]),
+    "ip": choice_field(IPS),
+    "count": int_field(1, 500),
+    "active": int_field(10, 20),
+    "total": const_field(20),
+    "order": int_field(10000, 99999),
+    "amount": float_field(5.99, 2499.99, 2),
+    "items": int_field(1, 12),
+    "service": choice_field(SERVICES),
+    "size": int_field(10, 5000),
+    "pct": int_field(75, 98),
+    "total_mb": choice_field([512, 1024, 2048, 4096]),
+    "free": float_field(0.5, 5.0, 1),
+    "depth": int_field(50, 5000),
+    "ttl": int_field(10, 3600),
+    "queue": choice_field(QUEUES),
+    "pos": int_field(1, 500),
+    "template": choice_field(TEMPLATES),
+    "job": choice_field(JOBS),
+    "filename": choice_field(FILENAMES),
+}
+
+
+def compile_msg(msg):
+    """Turn a message template into a closure that only draws the fields it uses.
+
+    The closure takes the getrandbits method of the caller's Random instance.
+    """
+    parts = []
+    tail = ""
+    total_bits = 0
+    for literal, name, spec, _ in string.Formatter().parse(msg):
+        tail += literal
+        if name is not None:
+            bits, gen = FIELD_GEN[name]
+            parts.append((tail, bits, (1 << bits) - 1, gen, spec))
+            total_bits += bits
+            tail = ""
+    if not parts:
+        # Nothing to fill in: skip the draw and the join entirely
+        return lambda getrandbits: tail
+
+    def render(getrandbits):
+        r = getrandbits(total_bits)
+        out = []
+        for lit, bits, mask, gen, spec in parts:
+            out.append(lit + format(gen(r & mask), spec))
+            r >>= bits
+        out.append(tail)
+        return "".join(out)
+    return render
+
+
+COMPILED_MSGS = {level: [compile_msg(m) for m in msgs] for level, msgs in MSG_MAP.items()}
+
+
+class ThreadedWriter:
+    """File-like wrapper that does the actual writes on a background thread.
+
+    write() only appends to a local buffer. flush() hands the buffer to the
+    writer thread and returns right away, so a slow filesystem never stalls
+    generation. The thread writes each chunk as it arrives, which keeps
+    tail -f readers current. At most max_chunks chunks wait in the queue;
+    past that flush() blocks until the thread catches up.
+
+    If a write fails the thread records the error and discards the rest, and
+    the next flush() or close() raises it.
+    """
+
+    def __init__(self, f, chunk_size=64 * 1024, max_chunks=64):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = bytearray()
+        self.error = None
+        self.queue = queue.Queue(maxsize=max_chunks)
+        self.thread = threading.Thread(target=self._drain)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._stop()
+
+    def write(self, data):
+        self.buf += data
+        if len(self.buf) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.error is not None:
+            raise self.error
+        if self.buf:
+            self.queue.put(bytes(self.buf))
+            self.buf.clear()
+
+    def close(self):
+        self._stop()
+        if self.error is not None:
+            raise self.error
+
+    def _stop(self):
+        if self.error is None and self.buf:
+            self.queue.put(bytes(self.buf))
+            self.buf.clear()
+        self.queue.put(None)
+        self.thread.join()
+
+    def _drain(self):
+        while True:
+            chunk = self.queue.get()
+            if chunk is None:
+                break
+            if self.error is not None:
+                # Keep emptying the queue so the producer never blocks on it
+                continue
+            try:
+                view = memoryview(chunk)
+                while view:
+                    view = view[self.f.write(view):]
+            except Exception as e:
+                self.error = e
 
 
 def write_line(f, line):
-    f.write(line + "\n")
+    f.write((line + "\n").encode())
+
+
+def sleep(f, seconds):
+    # Lines are buffered between sleeps; flush so tail -f sees them
+    # before we go idle.
     f.flush()
+    time.sleep(seconds)
+
 
+# [second, "YYYY-MM-DD HH:MM:SS"] -- the prefix only changes once a second,
+# so strftime is skipped for most lines.
+_ts_cache = [0, ""]
 
 def log_line(level, service, msg):
-    ts = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
-    return f"{ts} [{level:<5}] [{service}] {msg}"
+    now = time.time()
+    sec = int(now)
+    if sec != _ts_cache[0]:
+        _ts_cache[0] = sec
+        _ts_cache[1] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(sec))
+    ms = int((now - sec) * 1000)
+    return f"{_ts_cache[1]}.{ms:03d}{DECOR[level][service]}{msg}"
 
 
-running = True
+# Mutable cell so main() can test it through a local instead of a global.
+_running = [True]
 
 def handle_signal(sig, frame):
-    global running
-    running = False
+    _running[0] = False
 
 signal.signal(signal.SIGINT, handle_signal)
 signal.signal(signal.SIGTERM, handle_signal)
@@ -169,73 +331,73 @@ def main():
     output = OUTPUT
     if len(sys.argv) > 1:
         output = sys.argv[1]
+    rng = random.Random()
+    _rand, _choice, _randint, _uniform, _getrandbits = (
+        rng.random, rng.choice, rng.randint, rng.uniform, rng.getrandbits)
+    running = _running
 
     print(f"Writing live logs to {output} (Ctrl+C to stop)")
 
-    with open(output, "w") as f:
+    # Unbuffered: the writer thread hands each chunk straight to the OS
+    with open(output, "wb", buffering=0) as raw, ThreadedWriter(raw) as f:
         service = "api-gateway"
         for msg in [
             "Application starting: loghew-demo v2.4.1",
             "Loading configuration from /etc/app/config.yaml",
         ]:
             write_line(f, log_line("INFO", service, msg))
-        time.sleep(0.05)
+        sleep(f, 0.05)
 
         write_line(f, log_line("INFO", "db-pool", "Initializing connection pool: postgresql://db:5432/app (max=20)"))
-        time.sleep(0.15)
+        sleep(f, 0.15)
         write_line(f, log_line("INFO", "db-pool", "Connection pool ready: 20 connections established"))
         write_line(f, log_line("INFO", "cache-manager", "Redis connection established, cluster mode enabled"))
-        time.sleep(0.1)
+        sleep(f, 0.1)
         write_line(f, log_line("INFO", "message-queue", "Queue bindings established: 6 queues, 12 consumers"))
         write_line(f, log_line("INFO", service, "Server listening on 0.0.0.0:8080"))
         write_line(f, log_line("INFO", service, "Application ready — startup completed in 0.3s"))
-        time.sleep(0.2)
+        sleep(f, 0.2)
 
         burst_counter = 0
 
-        while running:
+        while running[0]:
             burst_counter += 1
 
-            if burst_counter % 200 == 0 and random.random() < 0.2:
-                burst_size = random.randint(5, 15)
+            if burst_counter % 200 == 0 and _rand() < 0.2:
+                burst_size = _randint(5, 15)
                 for _ in range(burst_size):
-                    if not running:
+                    if not running[0]:
                         break
-                    level = random.choices(LEVELS, [1, 5, 15, 35, 44])[0]
-                    service = random.choice(SERVICES)
-                    msg = fmt(random.choice(MSG_MAP[level]))
+                    level = LEVELS[bisect(BURST_LEVEL_CDF, _rand() * BURST_LEVEL_CDF[-1])]
+                    service = _choice(SERVICES)
+                    msg = _choice(COMPILED_MSGS[level])(_getrandbits)
                     write_line(f, log_line(level, service, msg))
 
-                    if level == "ERROR" and random.random() < 0.5:
-                        for trace_line in random.choice(STACK_TRACES):
-                            write_line(f, trace_line)
+                    if level == "ERROR" and _rand() < 0.5:
+                        f.write(_choice(STACK_BLOBS))
 
-                    time.sleep(random.uniform(0.01, 0.05))
+                    sleep(f, _uniform(0.01, 0.05))
                 continue
 
-            batch = random.randint(1, 3)
+            batch = _randint(1, 3)
             for _ in range(batch):
-                if not running:
+                if not running[0]:
                     break
-                level = random.choices(LEVELS, LEVEL_WEIGHTS)[0]
-                service = random.choice(SERVICES)
-                msg = fmt(random.choice(MSG_MAP[level]))
+                level = LEVELS[bisect(LEVEL_CDF, _rand() * LEVEL_CDF[-1])]
+                service = _choice(SERVICES)
+                msg = _choice(COMPILED_MSGS[level])(_getrandbits)
                 write_line(f, log_line(level, service, msg))
 
-                if level == "ERROR" and random.random() < 0.3:
-                    for trace_line in random.choice(STACK_TRACES):
-                        write_line(f, trace_line)
+                if level == "ERROR" and _rand() < 0.3:
+                    f.write(_choice(STACK_BLOBS))
 
-            delay = random.choices(
-                [0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0],
-                [20, 30, 25, 15, 5, 3, 2],
-            )[0]
-            time.sleep(delay)
+            delay = DELAYS[bisect(DELAY_CDF, _rand() * DELAY_CDF[-1])]
+            sleep(f, delay)
 
         write_line(f, log_line("INFO", "api-gateway", "Received SIGTERM, initiating graceful shutdown"))
-        time.sleep(0.1)
+        sleep(f, 0.1)
         write_line(f, log_line("INFO", "api-gateway", "Stopping HTTP listener, draining active connections..."))
-        time.sleep(0.3)
+        sleep(f, 0.3)
         write_line(f, log_line("INFO", "db-pool", "Connection pool drained: 20 connections closed"))
         write_line(f, log_line("INFO", "api-gateway", "Graceful shutdown completed"))
 
@@ -1,19 +1,53 @@
 #!/usr/bin/env python3
-"""Generate a realistic application log file for testing LogHew."""
+"""Generate a realistic application log file for testing LogHew.
 
+Usage: gen_log.py [size_gb] [jobs] [--compress]
+
+size_gb defaults to 0.005 and jobs (worker processes) to the CPU count.
+"""
+
+import calendar
+import collections
+import gzip
+import multiprocessing
+import os
 import random
-import datetime
+import string
 import sys
+import time
+from bisect import bisect
+from itertools import accumulate
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 random.seed(42)
 
 LEVELS = ["TRACE", "DEBUG", "INFO", "WARN", "ERROR"]
 LEVEL_WEIGHTS = [5, 15, 60, 15, 5]
+INCIDENT_LEVEL_WEIGHTS = [1, 5, 20, 30, 44]
+
+GAPS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000]
+GAP_WEIGHTS = [10, 15, 20, 20, 15, 8, 5, 3, 2, 1, 1]
+
+TRACE_TYPES = ["java", "rust", "python"]
+TRACE_TYPE_WEIGHTS = [60, 15, 25]
+
+# Cumulative weights for bisect-based picks in the hot loop; random.choices
+# rebuilds these (and a result list) on every call.
+GAP_CDF = list(accumulate(GAP_WEIGHTS))
+TRACE_TYPE_CDF = list(accumulate(TRACE_TYPE_WEIGHTS))
 
 SERVICES = ["api-gateway", "auth-service", "user-service", "payment-service",
             "notification-service", "cache-manager", "db-pool", "scheduler",
             "message-queue", "load-balancer"]
 
+# " [LEVEL] [service] " between the timestamp and the message, prebuilt for
+# every combination so the hot path doesn't pad and bracket them per line.
+DECOR = {l: {s: f" [{l:<5}] [{s}] " for s in SERVICES} for l in LEVELS}
+
 REQUEST_IDS = [f"{random.randint(1000000, 9999999):07x}" for _ in range(200)]
 
 ENDPOINTS = [
@@ -49,7 +83,7 @@ DEBUG_MSGS = [
     "JWT token validated for user {id}",
     "Rate limiter: {count}/100 requests in current window",
     "Connection acquired from pool (active: {active}/{total})",
-    "Scheduling task {task} for execution in {delay}ms",
+    "Scheduling task task-{task} for execution in {delay}ms",
     "Message published to queue '{queue}' (size: {size} bytes)",
     "TLS handshake completed with cipher TLS_AES_256_GCM_SHA384",
     "DNS resolved api.stripe.com to 52.18.{a}.{b} in {ms}ms",
@@ -192,6 +226,25 @@ PYTHON_TRACEBACKS = [
     ],
 ]
 
+HTTP_METHODS = ["GET", "POST", "PUT", "DELETE"]
+
+# The multi-line "Request details" block that follows some DEBUG/INFO lines
+REQUEST_DETAILS = (
+    "  Request details: {{\n"
+    '    "request_id": "{req_id}",\n'
+    '    "method": "{method}",\n'
+    '    "path": "{path}",\n'
+    '    "user_agent": "{ua}",\n'
+    '    "remote_addr": "{ip}"\n'
+    "  }}\n"
+)
+REQUEST_DETAILS_LINES = REQUEST_DETAILS.count("\n")
+
+# Each trace pre-joined into one newline-terminated string, with its line count
+JAVA_STACK_BLOBS = [("".join(l + "\n" for l in t), len(t)) for t in JAVA_STACK_TRACES]
+RUST_PANIC_BLOBS = [("".join(l + "\n" for l in t), len(t)) for t in RUST_PANICS]
+PYTHON_TRACEBACK_BLOBS = [("".join(l + "\n" for l in t), len(t)) for t in PYTHON_TRACEBACKS]
+
 IPS = [f"192.168.{random.randint(1,254)}.{random.randint(1,254)}" for _ in range(50)] + \
       [f"10.0.{random.randint(1,254)}.{random.randint(1,254)}" for _ in range(30)] + \
       [f"172.16.{random.randint(1,254)}.{random.randint(1,254)}" for _ in range(20)]
@@ -211,207 +264,412 @@ FILENAMES = ["report_2024.pdf", "avatar.png", "export.csv", "invoice_1234.pdf",
 QUEUES = ["email-notifications", "payment-processing", "order-updates",
           "analytics-events", "audit-log", "webhook-delivery"]
 
-def fmt(msg):
-    return msg.format(
-        id=random.randint(1000, 99999),
-        n=random.randint(1, 999),
-        req_id=random.choice(REQUEST_IDS),
-        endpoint=random.choice(ENDPOINTS),
-        ms=random.choice([1, 2, 3, 5, 8, 12, 23, 45, 67, 120, 234, 456, 789, 1200, 2345, 5678, 12340]),
-        ip=random.choice(IPS),
-        count=random.randint(1, 500),
-        active=random.randint(10, 20),
-        total=20,
-        order=random.randint(10000, 99999),
-        amount=round(random.uniform(5.99, 2499.99), 2),
-        items=random.randint(1, 12),
-        service=random.choice(SERVICES),
-        port=random.choice([8080, 8443, 3000, 9090]),
-        old=random.randint(4, 8),
-        new=random.randint(8, 16),
-        major=random.randint(1, 3),
-        minor=random.randint(0, 15),
-        patch=random.randint(0, 30),
-        filename=random.choice(FILENAMES),
-        size=random.randint(10, 5000),
-        pct=random.randint(75, 98),
-        free=round(random.uniform(0.5, 5.0), 1),
-        days=random.randint(7, 30),
-        agent=random.choice(AGENTS),
-        depth=random.randint(50, 5000),
-        ttl=random.randint(10, 3600),
-        task=f"task-{random.randint(1000,9999)}",
-        delay=random.randint(100, 30000),
-        queue=random.choice(QUEUES),
-        name=random.choice(["Trace", "Forward", "Debug", "Auth"]),
-        pos=random.randint(1, 500),
-        a=random.randint(1, 254),
-        b=random.randint(1, 254),
-        template=random.choice(TEMPLATES),
-        job=random.choice(JOBS),
-    )
-
-def get_msg(level):
-    if level == "TRACE":
-        return fmt(random.choice(TRACE_MSGS))
-    elif level == "DEBUG":
-        return fmt(random.choice(DEBUG_MSGS))
-    elif level == "INFO":
-        return fmt(random.choice(INFO_MSGS))
-    elif level == "WARN":
-        return fmt(random.choice(WARN_MSGS))
-    elif level == "ERROR":
-        return fmt(random.choice(ERROR_MSGS))
+# Each line draws all of its random fields from one getrandbits call.
+# A field is (bits, fn): fn gets its own `bits`-wide slice of that word. Ints
+# and choices take 8 bits more than their range needs, which keeps the modulo
+# bias under 0.4%.
+
+def int_field(lo, hi):
+    span = hi - lo + 1
+    return span.bit_length() + 8, lambda r: lo + r % span
+
+def choice_field(seq):
+    n = len(seq)
+    return n.bit_length() + 8, lambda r: seq[r % n]
+
+def float_field(lo, hi, ndigits):
+    return 32, lambda r: round(lo + (hi - lo) * r / (1 << 32), ndigits)
+
+def const_field(value):
+    return 0, lambda r: value
+
+FIELD_GEN = {
+    "id": int_field(1000, 99999),
+    "n": int_field(1, 999),
+    "req_id": choice_field(REQUEST_IDS),
+    "endpoint": choice_field(ENDPOINTS),
+    "ms": choice_field([1, 2, 3, 5, 8, 12, 23, 45, 67, 120, 234, 456, 789, 1200, 2345, 5678, 12340]),
+    "ip": choice_field(IPS),
+    "count": int_field(1, 500),
+    "active": int_field(10, 20),
+    "total": const_field(20),
+    "order": int_field(10000, 99999),
+    "amount": float_field(5.99, 2499.99, 2),
+    "items": int_field(1, 12),
+    "service": choice_field(SERVICES),
+    "port": choice_field([8080, 8443, 3000, 9090]),
+    "old": int_field(4, 8),
+    "new": int_field(8, 16),
+    "major": int_field(1, 3),
+    "minor": int_field(0, 15),
+    "patch": int_field(0, 30),
+    "filename": choice_field(FILENAMES),
+    "size": int_field(10, 5000),
+    "pct": int_field(75, 98),
+    "free": float_field(0.5, 5.0, 1),
+    "days": int_field(7, 30),
+    "agent": choice_field(AGENTS),
+    "depth": int_field(50, 5000),
+    "ttl": int_field(10, 3600),
+    "task": int_field(1000, 9999),
+    "delay": int_field(100, 30000),
+    "queue": choice_field(QUEUES),
+    "name": choice_field(["Trace", "Forward", "Debug", "Auth"]),
+    "pos": int_field(1, 500),
+    "a": int_field(1, 254),
+    "b": int_field(1, 254),
+    "template": choice_field(TEMPLATES),
+    "job": choice_field(JOBS),
+}
+
+def compile_msg(msg):
+    """Turn a message template into a closure that only draws the fields it uses.
+
+    The closure takes the getrandbits method of the caller's Random instance.
+    """
+    parts = []
+    tail = ""
+    total_bits = 0
+    for literal, name, spec, _ in string.Formatter().parse(msg):
+        tail += literal
+        if name is not None:
+            bits, gen = FIELD_GEN[name]
+            parts.append((tail, bits, (1 << bits) - 1, gen, spec))
+            total_bits += bits
+            tail = ""
+    if not parts:
+        # Nothing to fill in: skip the draw and the join entirely
+        return lambda getrandbits: tail
+
+    def render(getrandbits):
+        r = getrandbits(total_bits)
+        out = []
+        for lit, bits, mask, gen, spec in parts:
+            out.append(lit + format(gen(r & mask), spec))
+            r >>= bits
+        out.append(tail)
+        return "".join(out)
+    return render
+
+COMPILED_MSGS = {
+    level: [compile_msg(m) for m in msgs]
+    for level, msgs in zip(LEVELS, [TRACE_MSGS, DEBUG_MSGS, INFO_MSGS, WARN_MSGS, ERROR_MSGS])
+}
+
+def msg_table(level_weights):
+    """Flatten every (level, template) pair into one CDF.
+
+    A single bisect then picks the level and its template together, with each
+    level keeping its weight split evenly across its templates.
+    """
+    picks = []
+    cdf = []
+    total = 0.0
+    for level, weight in zip(LEVELS, level_weights):
+        renders = COMPILED_MSGS[level]
+        for render in renders:
+            total += weight / len(renders)
+            picks.append((level, render))
+            cdf.append(total)
+    return picks, cdf
+
+MSG_PICKS, MSG_CDF = msg_table(LEVEL_WEIGHTS)
+INCIDENT_MSG_PICKS, INCIDENT_MSG_CDF = msg_table(INCIDENT_LEVEL_WEIGHTS)
+
+# [second, "YYYY-MM-DD HH:MM:SS"] -- the prefix only changes once a second,
+# so strftime is skipped for most lines.
+_ts_cache = [None, ""]
+
+def fmt_ts(t_ms):
+    """Format a UTC timestamp given in integer milliseconds since the epoch."""
+    sec, ms = divmod(t_ms, 1000)
+    if sec != _ts_cache[0]:
+        _ts_cache[0] = sec
+        _ts_cache[1] = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(sec))
+    return f"{_ts_cache[1]}.{ms:03d}"
+
+# Generation is split into segments of simulated time (~450KB of output
+# each) that worker processes fill independently. Each segment is seeded by
+# its index, so the output doesn't depend on the number of workers.
+SEGMENT_MS = 10 * 60 * 1000
+SEGMENT_BYTES = 450 * 1024
+
+# Most a single loop iteration can advance the clock: the largest gap plus
+# the health-check and job nudges. Segments stop this far short of their end
+# so timestamps never overlap the next segment.
+MAX_STEP_MS = max(GAPS_MS) + 30000 + 100
+
+# Lines' worth of random picks drawn at a time in gen_segment().
+DRAW_BATCH = 1024
+
+# Smallest target worth reserving with posix_fallocate up front
+PREALLOCATE_MIN_BYTES = 1 << 30
+
+def trim_segment(data, keep, counts):
+    """Cut an uncompressed segment after the first line ending at or past keep bytes.
+
+    Returns (data, lines dropped, t), with the dropped lines' levels taken out
+    of counts and t the timestamp of the last line kept.
+    """
+    end = data.find(b"\n", keep - 1) + 1 or len(data)
+    dropped = data[end:].splitlines()
+    data = data[:end]
+    for line in dropped:
+        # Timestamped lines read "YYYY-MM-DD HH:MM:SS.mmm [LEVEL] ..."
+        if line[23:25] == b" [" and line[30:31] == b"]":
+            counts[line[25:30].decode().rstrip()] -= 1
+
+    t = None
+    for line in reversed(data.splitlines()):
+        if line[23:25] == b" [" and line[30:31] == b"]":
+            sec = calendar.timegm(time.strptime(line[:19].decode(), "%Y-%m-%d %H:%M:%S"))
+            t = sec * 1000 + int(line[20:23])
+            break
+    return data, len(dropped), t
+
+def write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+def compress(data):
+    """Compress a block into a standalone zstd frame, or a gzip member without zstandard.
+
+    Both formats allow frames/members to be concatenated, so segments can be
+    compressed independently in the workers.
+    """
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+def gen_segment(k, t, incident, compressed=False):
+    """Generate segment k starting at clock t.
+
+    Returns (data, size, lines, counts, t), where size is the uncompressed
+    length of data.
+    """
+    rng = random.Random(42 + k)
+    _rand, _choice, _choices, _randint, _getrandbits = (
+        rng.random, rng.choice, rng.choices, rng.randint, rng.getrandbits)
+    end = t + SEGMENT_MS - MAX_STEP_MS
+    buf = bytearray()
+    line_count = 0
+    counts = {l: 0 for l in LEVELS}
+    i = 0
+    # Lines left until i reaches the next multiple of 500 / 2000, counted down
+    # instead of taking i % 500 and i % 2000 every iteration.
+    until_health = 500
+    until_job = 2000
+
+    # One window of incident-heavy traffic in the selected segments
+    zone_lo, zone_hi = (1000, 2000) if incident else (-1, -1)
+
+    while t < end:
+        # Draw the per-line gap, service and message picks for a whole batch
+        # in one choices() call each rather than one call per line.
+        for gap_ms, service, (level, render) in zip(
+                _choices(GAPS_MS, cum_weights=GAP_CDF, k=DRAW_BATCH),
+                _choices(SERVICES, k=DRAW_BATCH),
+                _choices(MSG_PICKS, cum_weights=MSG_CDF, k=DRAW_BATCH)):
+            if t >= end:
+                break
+            t += gap_ms
+
+            if zone_lo <= i <= zone_hi:
+                level, render = INCIDENT_MSG_PICKS[bisect(INCIDENT_MSG_CDF, _rand() * INCIDENT_MSG_CDF[-1])]
+
+            msg = render(_getrandbits)
+            ts_str = fmt_ts(t)
+
+            # Collect everything this event emits and append it to buf once.
+            chunk = [ts_str + DECOR[level][service] + msg + "\n"]
+            n = 1
+            counts[level] += 1
+
+            if level == "ERROR" and _rand() < 0.4:
+                trace_type = TRACE_TYPES[bisect(TRACE_TYPE_CDF, _rand() * TRACE_TYPE_CDF[-1])]
+                if trace_type == "java":
+                    trace, trace_lines = _choice(JAVA_STACK_BLOBS)
+                elif trace_type == "rust":
+                    trace, trace_lines = _choice(RUST_PANIC_BLOBS)
+                else:
+                    trace, trace_lines = _choice(PYTHON_TRACEBACK_BLOBS)
+                chunk.append(trace)
+                n += trace_lines
+
+            if level in ("DEBUG", "INFO") and _rand() < 0.02:
+                chunk.append(REQUEST_DETAILS.format(
+                    req_id=_choice(REQUEST_IDS),
+                    method=_choice(HTTP_METHODS),
+                    path=_choice(ENDPOINTS),
+                    ua=_choice(AGENTS),
+                    ip=_choice(IPS),
+                ))
+                n += REQUEST_DETAILS_LINES
+
+            i += n
+            until_health -= n
+            until_job -= n
+
+            # An event is under 500 lines, so each countdown wraps at most once;
+            # a periodic line is only due when i lands exactly on the multiple.
+            if until_health <= 0:
+                until_health += 500
+                if until_health == 500:
+                    t += 30000
+                    ts_str = fmt_ts(t)
+                    chunk.append(f"{ts_str} [INFO ] [load-balancer] Health check passed: all 8 dependencies healthy\n")
+                    counts["INFO"] += 1
+                    n += 1
+                    i += 1
+                    until_health -= 1
+                    until_job -= 1
+
+            if until_job <= 0:
+                until_job += 2000
+                if until_job == 2000:
+                    t += 100
+                    ts_str = fmt_ts(t)
+                    job = _choice(JOBS)
+                    dur = _randint(50, 15000)
+                    chunk.append(f"{ts_str} [INFO ] [scheduler] Scheduled job '{job}' completed in {dur}ms\n")
+                    counts["INFO"] += 1
+                    n += 1
+                    i += 1
+                    until_health -= 1
+                    until_job -= 1
+
+            line_count += n
+            buf += "".join(chunk).encode()
+
+    return (compress(buf) if compressed else buf), len(buf), line_count, counts, t
 
 def main():
-    target_gb = float(sys.argv[1]) if len(sys.argv) > 1 else 0.005
+    args = [a for a in sys.argv[1:] if a != "--compress"]
+    compressed = len(args) < len(sys.argv) - 1
+    target_gb = float(args[0]) if args else 0.005
     target_bytes = int(target_gb * 1024 * 1024 * 1024)
+    jobs = int(args[1]) if len(args) > 1 else os.cpu_count() or 1
+    if jobs < 1:
+        sys.exit("usage: gen_log.py [size_gb] [jobs] [--compress] (jobs must be at least 1)")
     output = "test.log"
+    if compressed:
+        output += ".zst" if zstandard is not None else ".gz"
 
-    start = datetime.datetime(2024, 11, 15, 6, 0, 0)
-    t = start
+    # Timestamps are integer milliseconds since the epoch (UTC).
+    start = calendar.timegm((2024, 11, 15, 6, 0, 0)) * 1000
 
     startup = [
-        (t, "INFO",  "api-gateway", "Application starting: loghew-demo v2.4.1"),
-        (t + datetime.timedelta(milliseconds=50), "INFO", "api-gateway", "Loading configuration from /etc/app/config.yaml"),
-        (t + datetime.timedelta(milliseconds=120), "INFO", "db-pool", "Initializing connection pool: postgresql://db:5432/app (max=20)"),
-        (t + datetime.timedelta(milliseconds=350), "INFO", "db-pool", "Connection pool ready: 20 connections established"),
-        (t + datetime.timedelta(milliseconds=400), "INFO", "cache-manager", "Connecting to Redis cluster: redis://cache:6379"),
-        (t + datetime.timedelta(milliseconds=520), "INFO", "cache-manager", "Redis connection established, cluster mode enabled"),
-        (t + datetime.timedelta(milliseconds=600), "INFO", "cache-manager", "Cache warmed up: 14523 entries loaded in 80ms"),
-        (t + datetime.timedelta(milliseconds=700), "INFO", "message-queue", "Connecting to RabbitMQ: amqp://mq:5672"),
-        (t + datetime.timedelta(milliseconds=850), "INFO", "message-queue", "Queue bindings established: 6 queues, 12 consumers"),
-        (t + datetime.timedelta(seconds=1), "INFO", "scheduler", "Scheduled jobs loaded: 7 jobs registered"),
-        (t + datetime.timedelta(seconds=1, milliseconds=100), "INFO", "api-gateway", "Server listening on 0.0.0.0:8080"),
-        (t + datetime.timedelta(seconds=1, milliseconds=150), "INFO", "api-gateway", "Server listening on 0.0.0.0:8443 (TLS)"),
-        (t + datetime.timedelta(seconds=1, milliseconds=200), "INFO", "api-gateway", "Application ready — startup completed in 1.2s"),
+        (0, "INFO",  "api-gateway", "Application starting: loghew-demo v2.4.1"),
+        (50, "INFO", "api-gateway", "Loading configuration from /etc/app/config.yaml"),
+        (120, "INFO", "db-pool", "Initializing connection pool: postgresql://db:5432/app (max=20)"),
+        (350, "INFO", "db-pool", "Connection pool ready: 20 connections established"),
+        (400, "INFO", "cache-manager", "Connecting to Redis cluster: redis://cache:6379"),
+        (520, "INFO", "cache-manager", "Redis connection established, cluster mode enabled"),
+        (600, "INFO", "cache-manager", "Cache warmed up: 14523 entries loaded in 80ms"),
+        (700, "INFO", "message-queue", "Connecting to RabbitMQ: amqp://mq:5672"),
+        (850, "INFO", "message-queue", "Queue bindings established: 6 queues, 12 consumers"),
+        (1000, "INFO", "scheduler", "Scheduled jobs loaded: 7 jobs registered"),
+        (1100, "INFO", "api-gateway", "Server listening on 0.0.0.0:8080"),
+        (1150, "INFO", "api-gateway", "Server listening on 0.0.0.0:8443 (TLS)"),
+        (1200, "INFO", "api-gateway", "Application ready — startup completed in 1.2s"),
     ]
 
-    print(f"Generating ~{target_gb}GB → {output}")
+    print(f"Generating ~{target_gb}GB → {output} (jobs: {jobs})")
 
+    # written counts uncompressed bytes, so target_bytes means the same with
+    # or without --compress; stored is what actually lands on disk.
     written = 0
+    stored = 0
     line_count = 0
     counts = {l: 0 for l in LEVELS}
 
-    with open(output, "w", buffering=1024*1024) as f:
-        for ts, level, service, msg in startup:
-            line = f"{ts.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]} [{level:<5}] [{service}] {msg}\n"
-            f.write(line)
-            written += len(line)
+    # Scatter several incident windows across the file
+    zone_every = max(2, target_bytes // (20 * SEGMENT_BYTES))
+
+    # O_BINARY (Windows only) keeps os.write from turning \n into \r\n
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+    fd = os.open(output, flags, 0o644)
+    reserved = False
+    try:
+        # For multi-GB runs on Linux, reserve the whole file up front so the
+        # filesystem can lay it out in a few extents instead of growing it
+        # one write at a time.
+        if (not compressed and sys.platform == "linux"
+                and target_bytes >= PREALLOCATE_MIN_BYTES):
+            try:
+                os.posix_fallocate(fd, 0, target_bytes)
+                reserved = True
+            except OSError:
+                pass
+        buf = bytearray()
+        for offset, level, service, msg in startup:
+            buf += f"{fmt_ts(start + offset)} [{level:<5}] [{service}] {msg}\n".encode()
             line_count += 1
             counts["INFO"] += 1
-
-        t = start + datetime.timedelta(seconds=2)
-        i = line_count
-
-        # Scatter several incident windows across the file
-        incident_zones = set()
-        zone_spacing = max(10000, target_bytes // (100 * 100))
-        for z in range(1, 20):
-            center = z * zone_spacing
-            for offset in range(-500, 501):
-                incident_zones.add(center + offset)
-
-        while written < target_bytes:
-            gap_ms = random.choices(
-                [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000],
-                [10, 15, 20, 20, 15, 8, 5, 3, 2, 1, 1],
-            )[0]
-            t += datetime.timedelta(milliseconds=gap_ms)
-
-            if i in incident_zones:
-                level = random.choices(LEVELS, [1, 5, 20, 30, 44])[0]
-            else:
-                level = random.choices(LEVELS, LEVEL_WEIGHTS)[0]
-
-            service = random.choice(SERVICES)
-            msg = get_msg(level)
-            ts_str = t.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
-
-            line = f"{ts_str} [{level:<5}] [{service}] {msg}\n"
-            f.write(line)
-            written += len(line)
-            line_count += 1
-            counts[level] += 1
-            i += 1
-
-            if level == "ERROR" and random.random() < 0.4:
-                trace_type = random.choices(["java", "rust", "python"], [60, 15, 25])[0]
-                if trace_type == "java":
-                    trace = random.choice(JAVA_STACK_TRACES)
-                elif trace_type == "rust":
-                    trace = random.choice(RUST_PANICS)
-                else:
-                    trace = random.choice(PYTHON_TRACEBACKS)
-                for trace_line in trace:
-                    line = trace_line + "\n"
-                    f.write(line)
-                    written += len(line)
-                    line_count += 1
-                    i += 1
-
-            if level in ("DEBUG", "INFO") and random.random() < 0.02:
-                req_id = random.choice(REQUEST_IDS)
-                json_lines = [
-                    f"  Request details: {{",
-                    f'    "request_id": "{req_id}",',
-                    f'    "method": "{random.choice(["GET", "POST", "PUT", "DELETE"])}",',
-                    f'    "path": "{random.choice(ENDPOINTS)}",',
-                    f'    "user_agent": "{random.choice(AGENTS)}",',
-                    f'    "remote_addr": "{random.choice(IPS)}"',
-                    f"  }}",
-                ]
-                for jl in json_lines:
-                    line = jl + "\n"
-                    f.write(line)
-                    written += len(line)
-                    line_count += 1
-                    i += 1
-
-            if i % 500 == 0:
-                t += datetime.timedelta(seconds=30)
-                ts_str = t.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
-                line = f"{ts_str} [INFO ] [load-balancer] Health check passed: all 8 dependencies healthy\n"
-                f.write(line)
-                written += len(line)
-                line_count += 1
-                counts["INFO"] += 1
-                i += 1
-
-            if i % 2000 == 0:
-                t += datetime.timedelta(milliseconds=100)
-                ts_str = t.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
-                job = random.choice(JOBS)
-                dur = random.randint(50, 15000)
-                line = f"{ts_str} [INFO ] [scheduler] Scheduled job '{job}' completed in {dur}ms\n"
-                f.write(line)
-                written += len(line)
-                line_count += 1
-                counts["INFO"] += 1
-                i += 1
-
-            if line_count % 1000000 == 0:
-                pct = written / target_bytes * 100
-                print(f"  {written / (1024*1024*1024):.2f}GB ({pct:.0f}%) - {line_count:,} lines")
+        data = compress(buf) if compressed else buf
+        write_all(fd, data)
+        written += len(buf)
+        stored += len(data)
+
+        t = start + 2000
+        with multiprocessing.Pool(jobs) as pool:
+            # Keep a couple of segments per worker in flight and write them
+            # back in order, so the file stays sorted by timestamp.
+            pending = collections.deque()
+            k = 0
+            # Only queue as many segments as the remaining budget needs.
+            while written < target_bytes:
+                while (len(pending) < 2 * jobs
+                       and written + SEGMENT_BYTES * len(pending) < target_bytes):
+                    incident = k % zone_every == 0 and 0 < k // zone_every < 20
+                    pending.append(pool.apply_async(
+                        gen_segment, (k, start + 2000 + k * SEGMENT_MS, incident, compressed)))
+                    k += 1
+                data, size, lines, seg_counts, t = pending.popleft().get()
+                if not compressed and written + size > target_bytes:
+                    data, dropped, last_t = trim_segment(data, target_bytes - written, seg_counts)
+                    size = len(data)
+                    lines -= dropped
+                    t = last_t if last_t is not None else t
+                write_all(fd, data)
+                written += size
+                stored += len(data)
+                if (line_count + lines) // 1000000 != line_count // 1000000:
+                    pct = written / target_bytes * 100
+                    print(f"  {written / (1024*1024*1024):.2f}GB ({pct:.0f}%) - {line_count + lines:,} lines")
+                line_count += lines
+                for l in LEVELS:
+                    counts[l] += seg_counts[l]
 
         # Shutdown sequence
-        t += datetime.timedelta(seconds=1)
+        t += 1000
         shutdown = [
-            (t, "INFO", "api-gateway", "Received SIGTERM, initiating graceful shutdown"),
-            (t + datetime.timedelta(milliseconds=100), "INFO", "api-gateway", "Stopping HTTP listener, draining active connections..."),
-            (t + datetime.timedelta(milliseconds=500), "INFO", "scheduler", "Cancelling 3 pending scheduled jobs"),
-            (t + datetime.timedelta(seconds=1), "INFO", "message-queue", "Closing queue connections, 0 messages pending"),
-            (t + datetime.timedelta(seconds=1, milliseconds=200), "INFO", "cache-manager", "Redis connection closed"),
-            (t + datetime.timedelta(seconds=1, milliseconds=500), "INFO", "db-pool", "Connection pool drained: 20 connections closed"),
-            (t + datetime.timedelta(seconds=2), "INFO", "api-gateway", "Graceful shutdown completed in 2.0s"),
+            (0, "INFO", "api-gateway", "Received SIGTERM, initiating graceful shutdown"),
+            (100, "INFO", "api-gateway", "Stopping HTTP listener, draining active connections..."),
+            (500, "INFO", "scheduler", "Cancelling 3 pending scheduled jobs"),
+            (1000, "INFO", "message-queue", "Closing queue connections, 0 messages pending"),
+            (1200, "INFO", "cache-manager", "Redis connection closed"),
+            (1500, "INFO", "db-pool", "Connection pool drained: 20 connections closed"),
+            (2000, "INFO", "api-gateway", "Graceful shutdown completed in 2.0s"),
         ]
-        for ts, level, service, msg in shutdown:
-            line = f"{ts.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]} [{level:<5}] [{service}] {msg}\n"
-            f.write(line)
-            written += len(line)
+        buf = bytearray()
+        for offset, level, service, msg in shutdown:
+            buf += f"{fmt_ts(t + offset)} [{level:<5}] [{service}] {msg}\n".encode()
             line_count += 1
+        data = compress(buf) if compressed else buf
+        write_all(fd, data)
+        written += len(buf)
+        stored += len(data)
+    finally:
+        # Drop whatever part of the reservation wasn't written
+        if reserved:
+            os.ftruncate(fd, os.lseek(fd, 0, os.SEEK_CUR))
+        os.close(fd)
 
     print(f"Generated {line_count:,} lines ({written / (1024*1024*1024):.2f}GB) → {output}")
+    if compressed:
+        print(f"  {stored / (1024*1024):.1f}MB on disk ({written / max(stored, 1):.1f}x)")
     for l in LEVELS:
         print(f"  {l}: {counts[l]:,}")
 